@@ -9,17 +9,36 @@ Output:
   JSONs → static/data/charts/
 """
 
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
 from analyses.platform_comparison import platform_comparison
 from analyses.whale_tracker import whale_tracker
 from analyses.market_categories import market_categories
 from analyses.spread_liquidity import spread_liquidity
+from analyses.utils import use_worker_share
+
+ANALYSES = [platform_comparison, whale_tracker, market_categories, spread_liquidity]
+LOG_CONFIG = {"level": logging.INFO, "format": "%(message)s"}
+
+
+def _init_worker(n_workers):
+    logging.basicConfig(**LOG_CONFIG)
+    use_worker_share(n_workers)
+
 
 if __name__ == "__main__":
+    logging.basicConfig(**LOG_CONFIG)
     print("\nRunning Advanced Analyses (9–12)...\n")
-    platform_comparison()
-    whale_tracker()
-    market_categories()
-    spread_liquidity()
+    # The analyses read disjoint parquet sets, so run them side by side in separate
+    # processes, each with its own DuckDB connection capped at its share of the cores and
+    # memory so the concurrent scans can't oversubscribe or out-of-memory the machine
+    # (DUCKDB_THREADS overrides the thread share).
+    with ProcessPoolExecutor(max_workers=len(ANALYSES), initializer=partial(_init_worker, len(ANALYSES))) as ex:
+        futures = [ex.submit(fn) for fn in ANALYSES]
+        for future in futures:
+            future.result()
     print("\n" + "=" * 60)
     print("  ALL ADVANCED ANALYSES COMPLETE")
     print("=" * 60)
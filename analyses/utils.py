@@ -1,14 +1,33 @@
+import hashlib
+import inspect
+import io
+import logging
+import os
+from functools import lru_cache, wraps
 from pathlib import Path
 import duckdb
-import matplotlib.pyplot as plt
+import matplotlib
+matplotlib.use("Agg")  # charts are only ever written to files
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import json as _json
 
+try:
+    import orjson
+except ImportError:  # optional: faster JSON export with native numpy support
+    orjson = None
+
+log = logging.getLogger(__name__)
+
 BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / "data"
 OUTPUT_DIR = BASE_DIR / "output" / "rookie"
 CHARTS_DIR = BASE_DIR / "static" / "charts"
 CHART_JSON_DIR = BASE_DIR / "static" / "data" / "charts"
-for d in (OUTPUT_DIR, CHARTS_DIR, CHART_JSON_DIR):
+CACHE_DIR = BASE_DIR / "output" / "cache"
+# EMIT_PNG=0 skips the matplotlib PNG encode; the dashboard renders from the chart JSON
+EMIT_PNG = os.environ.get("EMIT_PNG", "1") == "1"
+for d in (OUTPUT_DIR, CHARTS_DIR, CHART_JSON_DIR, CACHE_DIR):
     d.mkdir(parents=True, exist_ok=True)
 
 KALSHI_TRADES = DATA_DIR / "kalshi" / "trades"
@@ -27,7 +46,7 @@ COLORS = {
     "poly": "#34d399",
 }
 
-plt.rcParams.update({
+matplotlib.rcParams.update({
     "figure.facecolor": "#0e1117",
     "axes.facecolor": "#0e1117",
     "axes.edgecolor": "#333",
@@ -39,19 +58,127 @@ plt.rcParams.update({
     "grid.alpha": 0.5,
     "font.family": "sans-serif",
     "font.size": 11,
+    "agg.path.chunksize": 10000,
 })
 
+VIEWS = {
+    "kalshi_trades": KALSHI_TRADES,
+    "kalshi_markets": KALSHI_MARKETS,
+    "poly_trades": POLY_TRADES,
+    "poly_markets": POLY_MARKETS,
+    "poly_blocks": POLY_BLOCKS,
+}
+
+# number of processes sharing the machine; set per worker through use_worker_share()
+_worker_share = 1
+
+def use_worker_share(n):
+    """Size this process's DuckDB connections to 1/``n`` of the cores and memory (pool initializer)."""
+    global _worker_share
+    _worker_share = n
+
+def _physical_memory():
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):  # no sysconf (Windows): keep DuckDB's default
+        return None
+
+def connect():
+    """New DuckDB connection with a view over each parquet dataset."""
+    con = duckdb.connect()
+    # keep parquet footers/row-group stats in memory; every analysis re-globs the same files
+    con.execute("SET parquet_metadata_cache = true")
+    threads = os.environ.get("DUCKDB_THREADS")
+    if not threads and _worker_share > 1:
+        threads = max(1, (os.cpu_count() or 1) // _worker_share)
+    if threads:
+        con.execute(f"PRAGMA threads={int(threads)}")
+    memory = _physical_memory()
+    if memory and _worker_share > 1:
+        # DuckDB defaults each instance to 80% of RAM; concurrent workers split that budget
+        con.execute(f"SET memory_limit = '{int(memory * 0.8 / _worker_share) >> 20}MB'")
+    for view, path in VIEWS.items():
+        # skip datasets that haven't been downloaded; binding a view over an empty glob fails
+        if any(path.glob("*.parquet")):
+            con.execute(f"CREATE VIEW {view} AS SELECT * FROM '{path}/*.parquet'")
+    return con
+
+@lru_cache(maxsize=None)
 def get_connection():
-    return duckdb.connect()
+    """Process-wide DuckDB connection with a view over each parquet dataset."""
+    return connect()
+
+def _source_stamp(files, *extra):
+    """Digest of ``files`` (path, size, mtime) plus any ``extra`` strings, e.g. the SQL that reads them."""
+    h = hashlib.blake2b(digest_size=16)
+    for p in files:
+        st = p.stat()
+        h.update(f"{p}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+    for e in extra:
+        h.update(e.encode())
+    return h.hexdigest()
+
+def _parquet_files(*sources):
+    return [p for s in sources for p in sorted(s.glob("*.parquet"))]
+
+def skip_if_unchanged(name, *sources):
+    """Skip an analysis whose ``name``.png/.json outputs were built from the current ``sources``.
+
+    Set REBUILD=1 to force a rerun.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            # JSON and PNGs carry separate stamps: an EMIT_PNG=0 run refreshes the JSON only,
+            # so it must not vouch for PNGs it never wrote
+            stamped = {CACHE_DIR / f"{name}.stamp": [CHART_JSON_DIR / f"{name}.json"]}
+            if EMIT_PNG:
+                stamped[CACHE_DIR / f"{name}.png.stamp"] = [OUTPUT_DIR / f"{name}.png", CHARTS_DIR / f"{name}.png"]
+            # utils.py too: _save/_save_json/new_figure and the shared styling shape every output
+            stamp = _source_stamp([Path(__file__), Path(inspect.getsourcefile(fn)), *_parquet_files(*sources)])
+            if not os.environ.get("REBUILD") and all(
+                stamp_path.exists() and stamp_path.read_text() == stamp and all(p.exists() for p in outputs)
+                for stamp_path, outputs in stamped.items()
+            ):
+                log.info("  Up to date: %s", name)
+                return None
+            result = fn(*args, **kwargs)
+            for stamp_path in stamped:
+                stamp_path.write_text(stamp)
+            return result
+        return wrapper
+    return decorator
+
+def new_figure(**kwargs):
+    """Agg-backed Figure outside pyplot's global figure registry; nothing to close afterwards."""
+    fig = Figure(**kwargs)
+    FigureCanvasAgg(fig)
+    return fig
 
 def _save(fig, name):
+    if not EMIT_PNG:
+        return
+    # encode the PNG once and write the same bytes to both output dirs
+    buf = io.BytesIO()
+    # no bbox_inches="tight": every figure lays itself out, so skip the extra measuring draw
+    # zlib level 1: a fraction of the default level's encode time for slightly larger files
+    fig.savefig(buf, format="png", dpi=150, pil_kwargs={"compress_level": 1})
     for d in (OUTPUT_DIR, CHARTS_DIR):
-        fig.savefig(d / name, dpi=150, bbox_inches="tight")
-    plt.close(fig)
-    print(f"  Saved: {name}")
+        (d / name).write_bytes(buf.getvalue())
+    log.info("  Saved: %s", name)
+
+def _to_json(obj):
+    # numpy arrays/scalars and pandas Series: the encoders call this for types they don't handle natively
+    return obj.tolist()
 
 def _save_json(filename, data):
     path = CHART_JSON_DIR / filename
-    with open(path, "w") as f:
-        _json.dump(data, f, separators=(",", ":"))
-    print(f"  Saved JSON: {path}")
+    # write to a temp file and rename so /api/chart-data never serves a half-written file during a rerun
+    tmp = path.with_suffix(".json.tmp")
+    if orjson is not None:
+        tmp.write_bytes(orjson.dumps(data, default=_to_json, option=orjson.OPT_SERIALIZE_NUMPY))
+    else:
+        with open(tmp, "w") as f:
+            _json.dump(data, f, separators=(",", ":"), default=_to_json)
+    os.replace(tmp, path)
+    log.info("  Saved JSON: %s", path)
@@ -8,9 +8,17 @@ DATA_PATH = os.path.join(app.static_folder, "data", "analyses.json")
 CHARTS_DIR = os.path.join(app.static_folder, "charts")
 
 
+_cache = {"mtime": None, "data": None, "by_id": {}}
+
+
 def load_data():
-    with open(DATA_PATH, "r") as f:
-        return json.load(f)
+    """Parsed analyses.json, re-read only when the file changes on disk."""
+    mtime = os.path.getmtime(DATA_PATH)
+    if mtime != _cache["mtime"]:
+        with open(DATA_PATH, "r") as f:
+            data = json.load(f)
+        _cache.update(mtime=mtime, data=data, by_id={a["id"]: a for a in data["analyses"]})
+    return _cache["data"]
 
 
 # ── Pages ──────────────────────────────────────────────────────────
@@ -55,10 +63,10 @@ def api_analyses():
 @app.route("/api/analysis/<int:analysis_id>")
 def api_analysis(analysis_id):
     """Single analysis with full detail."""
-    data = load_data()
-    for a in data["analyses"]:
-        if a["id"] == analysis_id:
-            return jsonify(a)
+    load_data()
+    a = _cache["by_id"].get(analysis_id)
+    if a is not None:
+        return jsonify(a)
     return jsonify({"error": "Analysis not found"}), 404
 
 
@@ -17,15 +17,30 @@ Output: PNGs → output/rookie/ + static/charts/
         JSONs → static/data/charts/
 """
 
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import duckdb
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 from matplotlib.colors import TwoSlopeNorm
 
 from analyses.utils import (
+    connect,
     get_connection,
+    use_worker_share,
+    _parquet_files,
+    _source_stamp,
+    new_figure,
     _save,
     _save_json,
+    CACHE_DIR,
     KALSHI_TRADES,
     KALSHI_MARKETS,
     OUTPUT_DIR,
@@ -42,6 +57,79 @@ COLORS = {
 }
 
 
+TRADES_JOINED_SQL = """
+    SELECT
+        t.yes_price::UTINYINT AS yes_price,
+        t.no_price::UTINYINT AS no_price,
+        t.count::UINTEGER AS count,
+        t.taker_side = 'yes' AS taker_yes,
+        m.result = 'yes' AS result_yes,
+        EXTRACT(HOUR FROM t.created_time)::UTINYINT AS hour,
+        (EXTRACT(EPOCH FROM (m.close_time - t.created_time)) / 3600.0)::REAL AS hours_to_close
+    FROM kalshi_trades t
+    INNER JOIN (
+        SELECT ticker, result, close_time
+        FROM kalshi_markets
+        WHERE status = 'finalized' AND result IN ('yes', 'no')
+    ) m ON t.ticker = m.ticker
+"""
+TRADES_JOINED_DB = CACHE_DIR / "trades_joined.duckdb"
+
+
+def _build_trades_joined(con, key):
+    """Materialize TRADES_JOINED_SQL into the on-disk cache, tagged with ``key``."""
+    tmp = TRADES_JOINED_DB.with_suffix(".duckdb.tmp")
+    tmp.unlink(missing_ok=True)
+    # a WAL left by an interrupted build would be replayed into the fresh file
+    tmp.with_name(tmp.name + ".wal").unlink(missing_ok=True)
+    con.execute(f"ATTACH '{tmp}' AS build")
+    con.execute(f"CREATE TABLE build.trades_joined AS {TRADES_JOINED_SQL}")
+    con.execute(f"CREATE TABLE build.cache_key AS SELECT '{key}' AS key")
+    con.execute("DETACH build")
+    TRADES_JOINED_DB.with_name(TRADES_JOINED_DB.name + ".wal").unlink(missing_ok=True)
+    tmp.replace(TRADES_JOINED_DB)
+
+
+def _attach_trades_joined(con):
+    """Attach the on-disk cache to ``con`` as ``cache``, rebuilding it first if it is stale."""
+    key = _source_stamp(_parquet_files(KALSHI_TRADES, KALSHI_MARKETS), TRADES_JOINED_SQL)
+    fresh = False
+    if TRADES_JOINED_DB.exists():
+        try:
+            con.execute(f"ATTACH '{TRADES_JOINED_DB}' AS cache (READ_ONLY)")
+            row = con.execute("SELECT key FROM cache.cache_key").fetchone()
+            fresh = row is not None and row[0] == key
+        except duckdb.Error as e:  # unreadable, foreign or older-format file: rebuild it
+            print(f"  trades_joined cache unreadable ({e}); rebuilding it")
+        if not fresh:
+            con.execute("DETACH DATABASE IF EXISTS cache")
+    if not fresh:
+        _build_trades_joined(con, key)
+        con.execute(f"ATTACH '{TRADES_JOINED_DB}' AS cache (READ_ONLY)")
+
+
+def build_trades_joined():
+    """Validate or rebuild the trades_joined cache on a short-lived connection, then release it."""
+    con = connect()
+    try:
+        _attach_trades_joined(con)
+    finally:
+        con.close()
+
+
+@lru_cache(maxsize=None)
+def get_trades_joined():
+    """Connection with ``trades_joined``: every trade on a resolved market, with its result.
+
+    The join is stored in output/cache/trades_joined.duckdb and reused across runs until the
+    Kalshi parquet files or TRADES_JOINED_SQL change.
+    """
+    con = get_connection()
+    _attach_trades_joined(con)
+    con.execute("CREATE OR REPLACE TEMP VIEW trades_joined AS SELECT * FROM cache.trades_joined")
+    return con
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  1. DATASET OVERVIEW
 # ══════════════════════════════════════════════════════════════════════════════
@@ -52,24 +140,31 @@ def analysis_1_dataset_overview():
 
     con = get_connection()
 
-    trade_stats = con.execute(f"""
+    # monthly bars; the all-time totals roll up from these few rows. Only the distinct-ticker
+    # count needs the raw trades again, and it reads just the ticker column
+    df = con.execute("""
         SELECT
+            DATE_TRUNC('month', created_time) AS month,
             COUNT(*) AS num_trades,
-            SUM(count) AS total_contracts,
-            COUNT(DISTINCT ticker) AS num_tickers,
+            SUM(count)::BIGINT AS contracts,
             MIN(created_time) AS first_trade,
             MAX(created_time) AS last_trade
-        FROM '{KALSHI_TRADES}/*.parquet'
-    """).fetchone()
+        FROM kalshi_trades
+        GROUP BY 1
+        ORDER BY 1
+    """).df()
+    num_tickers = con.execute("SELECT COUNT(DISTINCT ticker) FROM kalshi_trades").fetchone()[0]
+    trade_stats = (int(df["num_trades"].sum()), int(df["contracts"].sum()), num_tickers,
+                   df["first_trade"].min(), df["last_trade"].max())
 
-    market_stats = con.execute(f"""
+    market_stats = con.execute("""
         SELECT
             COUNT(*) AS num_markets,
             COUNT(DISTINCT event_ticker) AS num_events,
             SUM(CASE WHEN status = 'finalized' THEN 1 ELSE 0 END) AS resolved,
             SUM(CASE WHEN result = 'yes' THEN 1 ELSE 0 END) AS resolved_yes,
             SUM(CASE WHEN result = 'no' THEN 1 ELSE 0 END) AS resolved_no
-        FROM '{KALSHI_MARKETS}/*.parquet'
+        FROM kalshi_markets
     """).fetchone()
 
     print(f"\n  Kalshi Trades:     {trade_stats[0]:>15,}")
@@ -82,17 +177,8 @@ def analysis_1_dataset_overview():
     print(f"    → Yes:           {market_stats[3]:>15,}")
     print(f"    → No:            {market_stats[4]:>15,}")
 
-    df = con.execute(f"""
-        SELECT
-            DATE_TRUNC('month', created_time) AS month,
-            COUNT(*) AS num_trades,
-            SUM(count) AS contracts
-        FROM '{KALSHI_TRADES}/*.parquet'
-        GROUP BY month
-        ORDER BY month
-    """).df()
-
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 8), sharex=True)
+    fig = new_figure(figsize=(14, 8))
+    ax1, ax2 = fig.subplots(2, 1, sharex=True)
     ax1.bar(df["month"], df["num_trades"] / 1e6, width=25, color=COLORS["primary"], alpha=0.85)
     ax1.set_ylabel("Trades (millions)")
     ax1.set_title("Monthly Trading Activity on Kalshi", fontsize=16, fontweight="bold", pad=15)
@@ -101,13 +187,13 @@ def analysis_1_dataset_overview():
     ax2.set_ylabel("Contracts (millions)")
     ax2.set_xlabel("Date")
     ax2.grid(True, axis="y")
-    plt.tight_layout()
+    fig.tight_layout()
     _save(fig, "1_dataset_overview.png")
 
     _save_json("1_dataset_overview.json", {
-        "months": [str(m)[:10] for m in df["month"]],
-        "trades_millions": (df["num_trades"] / 1e6).round(3).tolist(),
-        "contracts_millions": (df["contracts"] / 1e6).round(3).tolist(),
+        "months": df["month"].dt.strftime("%Y-%m-%d").to_numpy(),
+        "trades_millions": np.round(df["num_trades"].to_numpy() / 1e6, 3),
+        "contracts_millions": np.round(df["contracts"].to_numpy() / 1e6, 3),
     })
 
 
@@ -119,40 +205,39 @@ def analysis_2_calibration_curve():
     print("  2/8  CALIBRATION CURVE")
     print("=" * 60)
 
-    con = get_connection()
-    df = con.execute(f"""
-        WITH resolved_markets AS (
-            SELECT ticker, result
-            FROM '{KALSHI_MARKETS}/*.parquet'
-            WHERE status = 'finalized' AND result IN ('yes', 'no')
-        ),
-        all_positions AS (
+    con = get_trades_joined()
+    res = con.execute("""
+        WITH sides AS (
             SELECT
-                CASE WHEN t.taker_side = 'yes' THEN t.yes_price ELSE t.no_price END AS price,
-                CASE WHEN t.taker_side = m.result THEN 1 ELSE 0 END AS won
-            FROM '{KALSHI_TRADES}/*.parquet' t
-            INNER JOIN resolved_markets m ON t.ticker = m.ticker
-            UNION ALL
+                CASE WHEN taker_yes THEN yes_price ELSE no_price END AS taker_price,
+                CASE WHEN taker_yes THEN no_price ELSE yes_price END AS maker_price,
+                (taker_yes = result_yes)::INTEGER AS taker_won
+            FROM trades_joined
+        ),
+        -- one scan, both sides of every trade: the maker holds the other contract and wins when the taker loses
+        per_side AS (
             SELECT
-                CASE WHEN t.taker_side = 'yes' THEN t.no_price ELSE t.yes_price END AS price,
-                CASE WHEN t.taker_side != m.result THEN 1 ELSE 0 END AS won
-            FROM '{KALSHI_TRADES}/*.parquet' t
-            INNER JOIN resolved_markets m ON t.ticker = m.ticker
+                CASE WHEN GROUPING(taker_price) = 0 THEN taker_price ELSE maker_price END AS price,
+                COUNT(*) AS n,
+                CASE WHEN GROUPING(taker_price) = 0 THEN SUM(taker_won) ELSE COUNT(*) - SUM(taker_won) END AS wins
+            FROM sides
+            GROUP BY GROUPING SETS ((taker_price), (maker_price))
         )
         SELECT
             price,
-            COUNT(*) AS total_trades,
-            SUM(won) AS wins,
-            100.0 * SUM(won) / COUNT(*) AS win_rate
-        FROM all_positions
+            SUM(n)::BIGINT AS total_trades,
+            SUM(wins)::BIGINT AS wins,
+            100.0 * SUM(wins) / SUM(n) AS win_rate
+        FROM per_side
         WHERE price BETWEEN 1 AND 99
         GROUP BY price
         ORDER BY price
-    """).df()
+    """).fetchnumpy()
 
-    fig, ax = plt.subplots(figsize=(10, 10))
-    sizes = np.clip(df["total_trades"] / df["total_trades"].max() * 200, 20, 200)
-    ax.scatter(df["price"], df["win_rate"], s=sizes, alpha=0.8, c=COLORS["primary"],
+    fig = new_figure(figsize=(10, 10))
+    ax = fig.subplots()
+    sizes = np.clip(res["total_trades"] / res["total_trades"].max() * 200, 20, 200)
+    ax.scatter(res["price"], res["win_rate"], s=sizes, alpha=0.8, c=COLORS["primary"],
                edgecolors="white", linewidths=0.3, zorder=3)
     ax.plot([0, 100], [0, 100], "--", color=COLORS["perfect"], linewidth=2,
             label="Perfect Calibration", zorder=2)
@@ -171,13 +256,13 @@ def analysis_2_calibration_curve():
         xy=(75, 30), fontsize=10, color="#aaa",
         bbox=dict(boxstyle="round,pad=0.5", facecolor="#1a1a2e", edgecolor="#333"),
     )
-    plt.tight_layout()
+    fig.tight_layout()
     _save(fig, "2_calibration_curve.png")
 
     _save_json("2_calibration_curve.json", {
-        "price": df["price"].tolist(),
-        "win_rate": df["win_rate"].round(3).tolist(),
-        "total_trades": df["total_trades"].tolist(),
+        "price": res["price"],
+        "win_rate": np.round(res["win_rate"], 3),
+        "total_trades": res["total_trades"],
     })
 
 
@@ -189,75 +274,71 @@ def analysis_3_longshot_bias():
     print("  3/8  LONGSHOT BIAS")
     print("=" * 60)
 
-    con = get_connection()
-    df = con.execute(f"""
-        WITH resolved_markets AS (
-            SELECT ticker, result
-            FROM '{KALSHI_MARKETS}/*.parquet'
-            WHERE status = 'finalized' AND result IN ('yes', 'no')
+    con = get_trades_joined()
+    res = con.execute("""
+        WITH trades_with_results AS (
+            SELECT
+                t.yes_price, t.count, t.taker_yes,
+                (t.taker_yes = t.result_yes)::INTEGER AS taker_won
+            FROM trades_joined t
         ),
-        trades_with_results AS (
+        by_price AS (
             SELECT
-                t.yes_price, t.count, t.taker_side, m.result,
-                CASE WHEN t.taker_side = m.result THEN 1 ELSE 0 END AS taker_won
-            FROM '{KALSHI_TRADES}/*.parquet' t
-            INNER JOIN resolved_markets m ON t.ticker = m.ticker
+                yes_price AS price,
+                COUNT(*) AS num_trades,
+                SUM(count) AS total_contracts,
+                AVG(taker_won) FILTER (WHERE taker_yes) AS yes_taker_win_rate,
+                AVG(taker_won) FILTER (WHERE NOT taker_yes) AS no_taker_win_rate
+            FROM trades_with_results
+            WHERE yes_price BETWEEN 1 AND 20
+            GROUP BY 1
         )
         SELECT
-            yes_price AS price,
-            COUNT(*) AS num_trades,
-            SUM(count) AS total_contracts,
-            AVG(CASE WHEN taker_side = 'yes' THEN taker_won ELSE NULL END) AS yes_taker_win_rate,
-            AVG(CASE WHEN taker_side = 'no' THEN taker_won ELSE NULL END) AS no_taker_win_rate
-        FROM trades_with_results
-        WHERE yes_price BETWEEN 1 AND 20
-        GROUP BY yes_price
-        ORDER BY yes_price
-    """).df()
-
-    df["implied_prob"] = df["price"] / 100.0
-    df["actual_win_rate"] = (
-        df["yes_taker_win_rate"].fillna(df["implied_prob"])
-        if df["yes_taker_win_rate"].notna().any()
-        else df["implied_prob"]
-    )
-    df["ev_per_dollar"] = df["actual_win_rate"] * 100 / df["price"]
+            *,
+            price / 100.0 AS implied_prob,
+            -- prices with no YES takers fall back to the implied probability
+            COALESCE(yes_taker_win_rate, price / 100.0) AS actual_win_rate,
+            COALESCE(yes_taker_win_rate, price / 100.0) * 100 / price AS ev_per_dollar
+        FROM by_price
+        ORDER BY price
+    """).fetchnumpy()
 
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
-    x = np.arange(len(df))
+    fig = new_figure(figsize=(16, 7))
+    ax1, ax2 = fig.subplots(1, 2)
+    x = np.arange(len(res["price"]))
     width = 0.35
-    ax1.bar(x - width / 2, df["implied_prob"] * 100, width,
+    ax1.bar(x - width / 2, res["implied_prob"] * 100, width,
             label="Implied Probability (Price)", color=COLORS["primary"], alpha=0.85)
-    ax1.bar(x + width / 2, df["actual_win_rate"] * 100, width,
+    ax1.bar(x + width / 2, res["actual_win_rate"] * 100, width,
             label="Actual Win Rate", color=COLORS["accent"], alpha=0.85)
     ax1.set_xticks(x)
-    ax1.set_xticklabels([f'{p}¢' for p in df["price"]])
+    ax1.set_xticklabels([f'{p}¢' for p in res["price"]])
     ax1.set_xlabel("Contract Price", fontsize=12)
     ax1.set_ylabel("Probability (%)", fontsize=12)
     ax1.set_title("Implied vs Actual Probability", fontsize=14, fontweight="bold")
     ax1.legend(fontsize=10)
     ax1.grid(True, axis="y", alpha=0.3)
 
-    colors = [COLORS["danger"] if ev < 1.0 else COLORS["secondary"] for ev in df["ev_per_dollar"]]
-    ax2.bar(x, df["ev_per_dollar"], color=colors, alpha=0.85)
+    colors = np.where(res["ev_per_dollar"] < 1.0, COLORS["danger"], COLORS["secondary"])
+    ax2.bar(x, res["ev_per_dollar"], color=colors, alpha=0.85)
     ax2.axhline(y=1.0, color=COLORS["perfect"], linestyle="--", linewidth=2, label="Fair value ($1.00)")
     ax2.set_xticks(x)
-    ax2.set_xticklabels([f'{p}¢' for p in df["price"]])
+    ax2.set_xticklabels([f'{p}¢' for p in res["price"]])
     ax2.set_xlabel("Contract Price", fontsize=12)
     ax2.set_ylabel("Expected Return per $1", fontsize=12)
     ax2.set_title("Return per Dollar (< $1 = losing bet)", fontsize=14, fontweight="bold")
     ax2.legend(fontsize=10)
     ax2.grid(True, axis="y", alpha=0.3)
 
-    fig.suptitle("Longshot Bias: Cheap Contracts Are Overpriced", fontsize=18, fontweight="bold", y=1.02)
-    plt.tight_layout()
+    fig.suptitle("Longshot Bias: Cheap Contracts Are Overpriced", fontsize=18, fontweight="bold")
+    fig.tight_layout(rect=(0, 0, 1, 0.94))
     _save(fig, "3_longshot_bias.png")
 
     _save_json("3_longshot_bias.json", {
-        "price": df["price"].tolist(),
-        "implied_prob": (df["implied_prob"] * 100).round(3).tolist(),
-        "actual_win_rate": (df["actual_win_rate"] * 100).round(3).tolist(),
-        "ev_per_dollar": df["ev_per_dollar"].round(4).tolist(),
+        "price": res["price"],
+        "implied_prob": np.round(res["implied_prob"] * 100, 3),
+        "actual_win_rate": np.round(res["actual_win_rate"] * 100, 3),
+        "ev_per_dollar": np.round(res["ev_per_dollar"], 4),
     })
 
 
@@ -269,61 +350,59 @@ def analysis_4_maker_vs_taker():
     print("  4/8  MAKER vs TAKER RETURNS")
     print("=" * 60)
 
-    con = get_connection()
-    df = con.execute(f"""
-        WITH resolved_markets AS (
-            SELECT ticker, result
-            FROM '{KALSHI_MARKETS}/*.parquet'
-            WHERE status = 'finalized' AND result IN ('yes', 'no')
-        ),
-        taker_positions AS (
+    con = get_trades_joined()
+    res = con.execute("""
+        WITH sides AS (
             SELECT
-                CASE WHEN t.taker_side = 'yes' THEN t.yes_price ELSE t.no_price END AS price,
-                CASE WHEN t.taker_side = m.result THEN 1.0 ELSE 0.0 END AS won,
-                t.count AS contracts
-            FROM '{KALSHI_TRADES}/*.parquet' t
-            INNER JOIN resolved_markets m ON t.ticker = m.ticker
+                CASE WHEN taker_yes THEN yes_price ELSE no_price END AS taker_price,
+                CASE WHEN taker_yes THEN no_price ELSE yes_price END AS maker_price,
+                (taker_yes = result_yes)::INTEGER AS taker_won,
+                count AS contracts
+            FROM trades_joined
         ),
-        maker_positions AS (
+        -- taker and maker aggregates from one scan; maker won = 1 - taker won
+        per_side AS (
             SELECT
-                CASE WHEN t.taker_side = 'yes' THEN t.no_price ELSE t.yes_price END AS price,
-                CASE WHEN t.taker_side != m.result THEN 1.0 ELSE 0.0 END AS won,
-                t.count AS contracts
-            FROM '{KALSHI_TRADES}/*.parquet' t
-            INNER JOIN resolved_markets m ON t.ticker = m.ticker
-        ),
-        taker_stats AS (
-            SELECT price,
-                   AVG(won) - price / 100.0 AS excess_return,
-                   SUM(contracts * (won - price / 100.0)) AS pnl,
-                   COUNT(*) AS n_trades
-            FROM taker_positions GROUP BY price
+                GROUPING(taker_price) = 0 AS is_taker,
+                CASE WHEN GROUPING(taker_price) = 0 THEN taker_price ELSE maker_price END AS price,
+                COUNT(*) AS n_trades,
+                SUM(taker_won) AS taker_wins,
+                SUM(contracts) AS contracts,
+                SUM(contracts * taker_won) AS taker_won_contracts
+            FROM sides
+            GROUP BY GROUPING SETS ((taker_price), (maker_price))
         ),
-        maker_stats AS (
-            SELECT price,
-                   AVG(won) - price / 100.0 AS excess_return,
-                   SUM(contracts * (won - price / 100.0)) AS pnl,
-                   COUNT(*) AS n_trades
-            FROM maker_positions GROUP BY price
+        stats AS (
+            SELECT
+                is_taker, price, n_trades,
+                CASE WHEN is_taker THEN taker_wins ELSE n_trades - taker_wins END / n_trades - price / 100.0 AS excess_return,
+                CASE WHEN is_taker THEN taker_won_contracts ELSE contracts - taker_won_contracts END - contracts * price / 100.0 AS pnl
+            FROM per_side
         )
         SELECT
-            t.price,
-            t.excess_return AS taker_excess, t.pnl AS taker_pnl, t.n_trades AS taker_n,
-            m.excess_return AS maker_excess, m.pnl AS maker_pnl, m.n_trades AS maker_n
-        FROM taker_stats t
-        JOIN maker_stats m ON t.price = m.price
-        WHERE t.price BETWEEN 1 AND 99
-        ORDER BY t.price
-    """).df()
-
-    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(14, 10))
-    ax1.fill_between(df["price"], df["taker_excess"] * 100, 0,
-                     where=df["taker_excess"] * 100 < 0, alpha=0.3, color=COLORS["taker"])
-    ax1.fill_between(df["price"], df["taker_excess"] * 100, 0,
-                     where=df["taker_excess"] * 100 >= 0, alpha=0.3, color=COLORS["secondary"])
-    ax1.plot(df["price"], df["taker_excess"] * 100, color=COLORS["taker"],
+            price,
+            ANY_VALUE(excess_return) FILTER (WHERE is_taker) AS taker_excess,
+            ANY_VALUE(pnl) FILTER (WHERE is_taker) AS taker_pnl,
+            ANY_VALUE(n_trades) FILTER (WHERE is_taker) AS taker_n,
+            ANY_VALUE(excess_return) FILTER (WHERE NOT is_taker) AS maker_excess,
+            ANY_VALUE(pnl) FILTER (WHERE NOT is_taker) AS maker_pnl,
+            ANY_VALUE(n_trades) FILTER (WHERE NOT is_taker) AS maker_n
+        FROM stats
+        WHERE price BETWEEN 1 AND 99
+        GROUP BY price
+        HAVING COUNT(*) = 2  -- price seen on both sides, as the old taker/maker inner join required
+        ORDER BY price
+    """).fetchnumpy()
+
+    fig = new_figure(figsize=(14, 10))
+    ax1, ax2 = fig.subplots(2, 1)
+    ax1.fill_between(res["price"], res["taker_excess"] * 100, 0,
+                     where=res["taker_excess"] * 100 < 0, alpha=0.3, color=COLORS["taker"])
+    ax1.fill_between(res["price"], res["taker_excess"] * 100, 0,
+                     where=res["taker_excess"] * 100 >= 0, alpha=0.3, color=COLORS["secondary"])
+    ax1.plot(res["price"], res["taker_excess"] * 100, color=COLORS["taker"],
              linewidth=2, label="Taker Excess Return")
-    ax1.plot(df["price"], df["maker_excess"] * 100, color=COLORS["maker"],
+    ax1.plot(res["price"], res["maker_excess"] * 100, color=COLORS["maker"],
              linewidth=2, label="Maker Excess Return")
     ax1.axhline(y=0, color="white", linestyle="-", linewidth=0.5, alpha=0.5)
     ax1.set_xlabel("Contract Price (cents)")
@@ -333,8 +412,8 @@ def analysis_4_maker_vs_taker():
     ax1.grid(True, alpha=0.3)
     ax1.set_xlim(1, 99)
 
-    ax2.bar(df["price"], df["taker_pnl"], color=COLORS["taker"], alpha=0.7, label="Taker P&L", width=1)
-    ax2.bar(df["price"], df["maker_pnl"], color=COLORS["maker"], alpha=0.7, label="Maker P&L", width=1)
+    ax2.bar(res["price"], res["taker_pnl"], color=COLORS["taker"], alpha=0.7, label="Taker P&L", width=1)
+    ax2.bar(res["price"], res["maker_pnl"], color=COLORS["maker"], alpha=0.7, label="Maker P&L", width=1)
     ax2.axhline(y=0, color="white", linestyle="-", linewidth=0.5, alpha=0.5)
     ax2.set_xlabel("Contract Price (cents)")
     ax2.set_ylabel("Profit/Loss (contracts)")
@@ -343,20 +422,20 @@ def analysis_4_maker_vs_taker():
     ax2.grid(True, axis="y", alpha=0.3)
     ax2.set_xlim(1, 99)
 
-    total_taker_pnl = df["taker_pnl"].sum()
-    total_maker_pnl = df["maker_pnl"].sum()
+    total_taker_pnl = res["taker_pnl"].sum()
+    total_maker_pnl = res["maker_pnl"].sum()
     print(f"\n  Total Taker P&L: {total_taker_pnl:>+15,.0f} contracts")
     print(f"  Total Maker P&L: {total_maker_pnl:>+15,.0f} contracts")
 
-    plt.tight_layout()
+    fig.tight_layout()
     _save(fig, "4_maker_vs_taker.png")
 
     _save_json("4_maker_vs_taker.json", {
-        "price": df["price"].tolist(),
-        "taker_excess": (df["taker_excess"] * 100).round(4).tolist(),
-        "maker_excess": (df["maker_excess"] * 100).round(4).tolist(),
-        "taker_pnl": df["taker_pnl"].round(0).tolist(),
-        "maker_pnl": df["maker_pnl"].round(0).tolist(),
+        "price": res["price"],
+        "taker_excess": np.round(res["taker_excess"] * 100, 4),
+        "maker_excess": np.round(res["maker_excess"] * 100, 4),
+        "taker_pnl": np.round(res["taker_pnl"], 0),
+        "maker_pnl": np.round(res["maker_pnl"], 0),
     })
 
 
@@ -369,16 +448,34 @@ def analysis_5_trade_size_distribution():
     print("=" * 60)
 
     con = get_connection()
-    df = con.execute(f"""
-        SELECT count AS trade_size, taker_side
-        FROM '{KALSHI_TRADES}/*.parquet'
+    # one row per distinct trade size: the distribution, quantiles and Lorenz curve
+    # are all exact functions of (size, frequency), so the raw trades never leave DuckDB
+    res = con.execute("""
+        SELECT count AS trade_size, COUNT(*) AS n
+        FROM kalshi_trades
         WHERE count >= 1
-    """).df()
-
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 7))
-
-    bins = np.logspace(0, np.log10(df["trade_size"].max()), 50)
-    ax1.hist(df["trade_size"], bins=bins, color=COLORS["primary"], alpha=0.8, edgecolor="none")
+        GROUP BY 1
+        ORDER BY 1
+    """).fetchnumpy()
+    sizes = res["trade_size"].astype(float)
+    freq = res["n"]
+    n_total = freq.sum()
+    cum_n = np.cumsum(freq)
+    cum_vol = np.cumsum(sizes * freq)
+    total_volume = cum_vol[-1]
+
+    def size_at_rank(k):
+        # k-th smallest trade (0-based) in the expanded distribution
+        return sizes[np.searchsorted(cum_n, k, side="right")]
+
+    fig = new_figure(figsize=(16, 7))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    bins = np.logspace(0, np.log10(sizes[-1]), 50)
+    hist_counts, hist_edges = np.histogram(sizes, bins=bins, weights=freq)
+    hist_counts = hist_counts.astype(np.int64)
+    ax1.bar(hist_edges[:-1], hist_counts, width=np.diff(hist_edges), align="edge",
+            color=COLORS["primary"], alpha=0.8, edgecolor="none")
     ax1.set_xscale("log")
     ax1.set_yscale("log")
     ax1.set_xlabel("Trade Size (contracts)", fontsize=12)
@@ -386,17 +483,19 @@ def analysis_5_trade_size_distribution():
     ax1.set_title("Trade Size Distribution (log-log)", fontsize=14, fontweight="bold")
     ax1.grid(True, alpha=0.3)
 
-    median_size = df["trade_size"].median()
-    mean_size = df["trade_size"].mean()
-    p99_size = df["trade_size"].quantile(0.99)
+    median_size = (size_at_rank((n_total - 1) // 2) + size_at_rank(n_total // 2)) / 2
+    mean_size = total_volume / n_total
+    pos = 0.99 * (n_total - 1)  # linear interpolation between order statistics, as pandas does
+    lo = int(pos)
+    p99_size = size_at_rank(lo) + (pos - lo) * (size_at_rank(min(lo + 1, n_total - 1)) - size_at_rank(lo))
     ax1.axvline(median_size, color=COLORS["perfect"], linestyle="--", label=f"Median: {median_size:.0f}")
     ax1.axvline(mean_size, color=COLORS["accent"], linestyle="--", label=f"Mean: {mean_size:.1f}")
     ax1.axvline(p99_size, color=COLORS["danger"], linestyle="--", label=f"99th pctl: {p99_size:.0f}")
     ax1.legend(fontsize=10)
 
-    sorted_sizes = np.sort(df["trade_size"].values)
-    cumulative_volume = np.cumsum(sorted_sizes) / sorted_sizes.sum()
-    percentiles = np.arange(1, len(sorted_sizes) + 1) / len(sorted_sizes)
+    # Within a run of equal sizes the Lorenz curve is a straight line, so the run endpoints trace it exactly
+    percentiles = np.concatenate(([0.0], cum_n / n_total))
+    cumulative_volume = np.concatenate(([0.0], cum_vol / total_volume))
     ax2.plot(percentiles * 100, cumulative_volume * 100, color=COLORS["secondary"], linewidth=2)
     ax2.set_xlabel("% of Trades (smallest to largest)", fontsize=12)
     ax2.set_ylabel("% of Total Volume", fontsize=12)
@@ -405,10 +504,14 @@ def analysis_5_trade_size_distribution():
     ax2.legend(fontsize=10)
     ax2.grid(True, alpha=0.3)
 
-    idx_50 = np.searchsorted(cumulative_volume, 0.5)
-    pct_at_50 = (1 - percentiles[idx_50]) * 100
+    # first trade at which cumulative volume reaches half the total
+    j = np.searchsorted(cum_vol, total_volume / 2)
+    prev_n = cum_n[j - 1] if j else 0
+    prev_vol = cum_vol[j - 1] if j else 0.0
+    rank_50 = prev_n + np.ceil((total_volume / 2 - prev_vol) / sizes[j])
+    pct_at_50 = (1 - rank_50 / n_total) * 100
     ax2.annotate(f"Top {pct_at_50:.1f}% of trades\n= 50% of volume",
-                 xy=(percentiles[idx_50] * 100, 50), fontsize=10, color=COLORS["accent"],
+                 xy=(rank_50 / n_total * 100, 50), fontsize=10, color=COLORS["accent"],
                  arrowprops=dict(arrowstyle="->", color=COLORS["accent"]),
                  xytext=(30, 70))
 
@@ -417,19 +520,17 @@ def analysis_5_trade_size_distribution():
     print(f"  99th percentile:    {p99_size:.0f} contracts")
     print(f"  Top {pct_at_50:.1f}% of trades = 50% of all volume")
 
-    fig.suptitle("Trade Size Distribution", fontsize=18, fontweight="bold", y=1.02)
-    plt.tight_layout()
+    fig.suptitle("Trade Size Distribution", fontsize=18, fontweight="bold")
+    fig.tight_layout(rect=(0, 0, 1, 0.94))
     _save(fig, "5_trade_size_distribution.png")
 
-    hist_counts, hist_edges = np.histogram(
-        df["trade_size"], bins=np.logspace(0, np.log10(df["trade_size"].max()), 50)
-    )
-    step = max(1, len(sorted_sizes) // 500)
+    lorenz_x = np.linspace(0, 1, 501)
+    lorenz_y = np.interp(lorenz_x, percentiles, cumulative_volume)
     _save_json("5_trade_size_distribution.json", {
-        "hist_bin_edges": hist_edges.round(2).tolist(),
-        "hist_counts": hist_counts.tolist(),
-        "lorenz_pct_trades": (percentiles[::step] * 100).round(2).tolist(),
-        "lorenz_pct_volume": (cumulative_volume[::step] * 100).round(2).tolist(),
+        "hist_bin_edges": np.round(hist_edges, 2),
+        "hist_counts": hist_counts,
+        "lorenz_pct_trades": np.round(lorenz_x * 100, 2),
+        "lorenz_pct_volume": np.round(lorenz_y * 100, 2),
         "median": float(median_size),
         "mean": round(float(mean_size), 1),
         "p99": float(p99_size),
@@ -445,21 +546,15 @@ def analysis_6_returns_by_hour():
     print("  6/8  RETURNS BY HOUR OF DAY")
     print("=" * 60)
 
-    con = get_connection()
-    df = con.execute(f"""
-        WITH resolved_markets AS (
-            SELECT ticker, result
-            FROM '{KALSHI_MARKETS}/*.parquet'
-            WHERE status = 'finalized' AND result IN ('yes', 'no')
-        ),
-        trade_data AS (
+    con = get_trades_joined()
+    res = con.execute("""
+        WITH trade_data AS (
             SELECT
-                EXTRACT(HOUR FROM t.created_time) AS hour,
-                CASE WHEN t.taker_side = 'yes' THEN t.yes_price ELSE t.no_price END AS price,
-                CASE WHEN t.taker_side = m.result THEN 1.0 ELSE 0.0 END AS won,
+                t.hour,
+                CASE WHEN t.taker_yes THEN t.yes_price ELSE t.no_price END AS price,
+                (t.taker_yes = t.result_yes)::DOUBLE AS won,
                 t.count AS contracts
-            FROM '{KALSHI_TRADES}/*.parquet' t
-            INNER JOIN resolved_markets m ON t.ticker = m.ticker
+            FROM trades_joined t
         )
         SELECT
             hour,
@@ -469,17 +564,18 @@ def analysis_6_returns_by_hour():
         FROM trade_data
         GROUP BY hour
         ORDER BY hour
-    """).df()
+    """).fetchnumpy()
 
-    fig, ax1 = plt.subplots(figsize=(14, 7))
+    fig = new_figure(figsize=(14, 7))
+    ax1 = fig.subplots()
     ax2 = ax1.twinx()
-    ax2.bar(df["hour"], df["total_contracts"] / 1e6, color=COLORS["neutral"],
+    ax2.bar(res["hour"], res["total_contracts"] / 1e6, color=COLORS["neutral"],
             alpha=0.2, width=0.8, label="Volume (M contracts)")
     ax2.set_ylabel("Volume (millions of contracts)", color="#666")
     ax2.tick_params(axis="y", labelcolor="#666")
 
-    colors_bar = [COLORS["danger"] if x < 0 else COLORS["secondary"] for x in df["excess_return"]]
-    ax1.bar(df["hour"], df["excess_return"] * 100, color=colors_bar, alpha=0.85, width=0.6)
+    colors_bar = np.where(res["excess_return"] < 0, COLORS["danger"], COLORS["secondary"])
+    ax1.bar(res["hour"], res["excess_return"] * 100, color=colors_bar, alpha=0.85, width=0.6)
     ax1.axhline(y=0, color="white", linestyle="-", linewidth=0.5, alpha=0.5)
     ax1.set_xlabel("Hour of Day (UTC)", fontsize=12)
     ax1.set_ylabel("Taker Excess Return (pp)", fontsize=12)
@@ -489,14 +585,14 @@ def analysis_6_returns_by_hour():
     ax1.set_xticklabels([f"{h:02d}" for h in range(24)], fontsize=9)
     ax1.grid(True, axis="y", alpha=0.3)
 
-    plt.tight_layout()
+    fig.tight_layout()
     _save(fig, "6_returns_by_hour.png")
 
     _save_json("6_returns_by_hour.json", {
-        "hour": df["hour"].tolist(),
-        "excess_return": (df["excess_return"] * 100).round(4).tolist(),
-        "total_contracts_millions": (df["total_contracts"] / 1e6).round(3).tolist(),
-        "n_trades": df["n_trades"].tolist(),
+        "hour": res["hour"],
+        "excess_return": np.round(res["excess_return"] * 100, 4),
+        "total_contracts_millions": np.round(res["total_contracts"] / 1e6, 3),
+        "n_trades": res["n_trades"],
     })
 
 
@@ -508,131 +604,121 @@ def analysis_7_calibration_surface():
     print("  7/8  CALIBRATION SURFACE (Price × Time)")
     print("=" * 60)
 
-    con = get_connection()
-    df = con.execute(f"""
-        WITH resolved_markets AS (
-            SELECT ticker, result, close_time
-            FROM '{KALSHI_MARKETS}/*.parquet'
-            WHERE status = 'finalized'
-              AND result IN ('yes', 'no')
-              AND close_time IS NOT NULL
-        ),
-        trades_with_time AS (
+    con = get_trades_joined()
+    res = con.execute("""
+        WITH trades_with_time AS (
             SELECT
-                CASE WHEN t.taker_side = 'yes' THEN t.yes_price ELSE t.no_price END AS price,
-                CASE WHEN t.taker_side = m.result THEN 1.0 ELSE 0.0 END AS won,
-                EXTRACT(EPOCH FROM (m.close_time - t.created_time)) / 3600.0 AS hours_to_close
-            FROM '{KALSHI_TRADES}/*.parquet' t
-            INNER JOIN resolved_markets m ON t.ticker = m.ticker
+                CASE WHEN t.taker_yes THEN t.yes_price ELSE t.no_price END AS price,
+                (t.taker_yes = t.result_yes)::DOUBLE AS won,
+                t.hours_to_close
+            FROM trades_joined t
+            WHERE t.hours_to_close IS NOT NULL
         ),
         binned AS (
             SELECT
-                FLOOR(price / 10) * 10 AS price_bin,
-                CASE
-                    WHEN hours_to_close < 1 THEN '< 1h'
-                    WHEN hours_to_close < 6 THEN '1-6h'
-                    WHEN hours_to_close < 24 THEN '6-24h'
-                    WHEN hours_to_close < 72 THEN '1-3d'
-                    WHEN hours_to_close < 168 THEN '3-7d'
-                    WHEN hours_to_close < 720 THEN '7-30d'
-                    ELSE '> 30d'
-                END AS time_bin,
-                CASE
-                    WHEN hours_to_close < 1 THEN 0
-                    WHEN hours_to_close < 6 THEN 1
-                    WHEN hours_to_close < 24 THEN 2
-                    WHEN hours_to_close < 72 THEN 3
-                    WHEN hours_to_close < 168 THEN 4
-                    WHEN hours_to_close < 720 THEN 5
-                    ELSE 6
-                END AS time_order,
+                price // 10 * 10 AS price_bin,
+                -- bucket index 0-6 (< 1h ... > 30d) as a sum of threshold tests, no CASE ladder
+                ((hours_to_close >= 1)::UTINYINT + (hours_to_close >= 6)::UTINYINT
+                    + (hours_to_close >= 24)::UTINYINT + (hours_to_close >= 72)::UTINYINT
+                    + (hours_to_close >= 168)::UTINYINT + (hours_to_close >= 720)::UTINYINT) AS time_order,
                 won, price
             FROM trades_with_time
             WHERE price BETWEEN 1 AND 99 AND hours_to_close > 0
         )
         SELECT
-            price_bin, time_bin, time_order,
+            price_bin, time_order,
             COUNT(*) AS n_trades,
             AVG(won) * 100 AS actual_win_rate,
             AVG(price) AS avg_price,
             AVG(won) * 100 - AVG(price) AS mispricing
         FROM binned
-        GROUP BY price_bin, time_bin, time_order
+        GROUP BY price_bin, time_order
         HAVING COUNT(*) >= 100
         ORDER BY price_bin, time_order
-    """).df()
+    """).fetchnumpy()
 
-    pivot = df.pivot_table(index="price_bin", columns="time_order", values="mispricing")
+    # price_bin x time_order grid, keeping only the bins that occur (as pivot_table did)
+    price_bins, pi = np.unique(res["price_bin"], return_inverse=True)
+    time_orders, ti = np.unique(res["time_order"], return_inverse=True)
+    grid = np.full((len(price_bins), len(time_orders)), np.nan)
+    grid[pi, ti] = res["mispricing"]
     time_labels = ["< 1h", "1-6h", "6-24h", "1-3d", "3-7d", "7-30d", "> 30d"]
 
-    fig, ax = plt.subplots(figsize=(12, 8))
-    vmax = max(abs(pivot.values.min()), abs(pivot.values.max()))
+    fig = new_figure(figsize=(12, 8))
+    ax = fig.subplots()
+    vmax = np.nanmax(np.abs(grid))
     norm = TwoSlopeNorm(vmin=-vmax, vcenter=0, vmax=vmax)
-    im = ax.imshow(pivot.values, cmap="RdYlGn", aspect="auto", norm=norm, origin="lower")
-    ax.set_xticks(range(len(pivot.columns)))
-    ax.set_xticklabels([time_labels[int(c)] for c in pivot.columns], fontsize=11)
-    ax.set_yticks(range(len(pivot.index)))
-    ax.set_yticklabels([f"{int(p)}-{int(p) + 10}¢" for p in pivot.index], fontsize=11)
-    for i in range(len(pivot.index)):
-        for j in range(len(pivot.columns)):
-            val = pivot.values[i, j]
+    im = ax.imshow(grid, cmap="RdYlGn", aspect="auto", norm=norm, origin="lower")
+    ax.set_xticks(range(len(time_orders)))
+    ax.set_xticklabels([time_labels[c] for c in time_orders], fontsize=11)
+    ax.set_yticks(range(len(price_bins)))
+    ax.set_yticklabels([f"{p}-{p + 10}¢" for p in price_bins], fontsize=11)
+    for i in range(len(price_bins)):
+        for j in range(len(time_orders)):
+            val = grid[i, j]
             if not np.isnan(val):
                 color = "black" if abs(val) < vmax * 0.5 else "white"
                 ax.text(j, i, f"{val:+.1f}", ha="center", va="center",
                         fontsize=9, fontweight="bold", color=color)
-    plt.colorbar(im, ax=ax, label="Mispricing (pp): Actual Win Rate - Implied Prob")
+    fig.colorbar(im, ax=ax, label="Mispricing (pp): Actual Win Rate - Implied Prob")
     ax.set_xlabel("Time to Market Close", fontsize=13)
     ax.set_ylabel("Price Bucket", fontsize=13)
     ax.set_title("Calibration Surface: Where & When Markets Are Wrong",
                  fontsize=16, fontweight="bold", pad=15)
-    plt.tight_layout()
+    fig.tight_layout()
     _save(fig, "7_calibration_surface.png")
 
     time_labels_map = {0: "< 1h", 1: "1-6h", 2: "6-24h", 3: "1-3d", 4: "3-7d", 5: "7-30d", 6: "> 30d"}
     _save_json("7_calibration_surface.json", {
-        "price_bins": [f"{int(p)}-{int(p)+10}¢" for p in pivot.index],
-        "time_bins": [time_labels_map[int(c)] for c in pivot.columns],
-        "mispricing": [
-            [round(v, 2) if not np.isnan(v) else None for v in row]
-            for row in pivot.values.tolist()
-        ],
+        "price_bins": [f"{p}-{p+10}¢" for p in price_bins],
+        "time_bins": [time_labels_map[c] for c in time_orders],
+        "mispricing": np.where(np.isnan(grid), None, np.round(grid, 2)).tolist(),
     })
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  8. MONTE CARLO KELLY
 # ══════════════════════════════════════════════════════════════════════════════
+def _simulate_paths(returns, rng, n_sims, n_trades, kelly_fraction, chunk=1000):
+    """Max drawdown and final return of ``n_sims`` bootstrapped equity paths, ``chunk`` paths at a time."""
+    max_drawdowns = np.empty(n_sims)
+    final_returns = np.empty(n_sims)
+    # row chunks draw from rng in the same order as one (n_sims, n_trades) draw,
+    # but peak memory stays at chunk x n_trades however many paths are simulated
+    for start in range(0, n_sims, chunk):
+        stop = min(start + chunk, n_sims)
+        sampled = returns[rng.integers(0, len(returns), dtype=np.int32, size=(stop - start, n_trades))]
+        equity = np.cumprod(1 + sampled * kelly_fraction, axis=1)
+        running_max = np.maximum.accumulate(equity, axis=1)
+        max_drawdowns[start:stop] = ((running_max - equity) / running_max).max(axis=1)
+        final_returns[start:stop] = equity[:, -1] - 1
+    return max_drawdowns, final_returns
+
+
 def analysis_8_monte_carlo_kelly():
     print("\n" + "=" * 60)
     print("  8/8  MONTE CARLO KELLY SIZING")
     print("=" * 60)
 
-    con = get_connection()
-    df = con.execute(f"""
-        WITH resolved_markets AS (
-            SELECT ticker, result
-            FROM '{KALSHI_MARKETS}/*.parquet'
-            WHERE status = 'finalized' AND result IN ('yes', 'no')
-        )
+    con = get_trades_joined()
+    res = con.execute("""
         SELECT
             t.yes_price AS price,
-            CASE WHEN t.taker_side = m.result THEN 1.0 ELSE 0.0 END AS won,
-            t.count AS contracts
-        FROM '{KALSHI_TRADES}/*.parquet' t
-        INNER JOIN resolved_markets m ON t.ticker = m.ticker
-        WHERE t.taker_side = 'yes' AND t.yes_price BETWEEN 5 AND 15
-    """).df()
-
-    if len(df) < 100:
+            CASE WHEN t.result_yes THEN (100.0 - t.yes_price) / t.yes_price ELSE -1.0 END::REAL AS return_pct
+        FROM trades_joined t
+        WHERE t.taker_yes AND t.yes_price BETWEEN 5 AND 15
+    """).fetchnumpy()
+    # float32 (REAL) halves the bytes the bootstrap moves; every output is rounded to 2-4 decimals,
+    # and the reductions/outputs below are kept in float64
+    returns = res["return_pct"]
+
+    if len(returns) < 100:
         print("  Not enough trades in 5-15 cent range for Monte Carlo. Skipping.")
         return
 
-    df["return_pct"] = np.where(df["won"] == 1, (100 - df["price"]) / df["price"], -1.0)
-    returns = df["return_pct"].values
-
-    avg_return = returns.mean()
-    win_rate = df["won"].mean()
-    implied_prob = df["price"].mean() / 100
+    avg_return = returns.mean(dtype=np.float64)
+    win_rate = (returns > 0).mean()  # at 5-15c every win pays > 0, every loss is -1
+    implied_prob = res["price"].mean() / 100
 
     print(f"\n  Signal: Buy YES at 5-15 cents on resolved markets")
     print(f"  Number of trades:  {len(returns):,}")
@@ -643,26 +729,23 @@ def analysis_8_monte_carlo_kelly():
 
     n_simulations = 5000
     n_trades_per_sim = min(200, len(returns))
-    max_drawdowns, final_returns = [], []
 
+    # one generator for every draw below; the 50 sample curves feed both the chart and the JSON
     rng = np.random.default_rng(42)
-    for _ in range(n_simulations):
-        sampled = rng.choice(returns, size=n_trades_per_sim, replace=True)
-        equity = np.cumprod(1 + sampled * 0.05)
-        running_max = np.maximum.accumulate(equity)
-        drawdown = (running_max - equity) / running_max
-        max_drawdowns.append(drawdown.max())
-        final_returns.append(equity[-1] - 1)
+    max_drawdowns, final_returns = _simulate_paths(returns, rng, n_simulations, n_trades_per_sim, 0.05)
+    sampled = returns[rng.integers(0, len(returns), dtype=np.int32, size=(50, n_trades_per_sim))]
+    # only 50 paths: compound in float64 so the exported curves carry no float32 rounding
+    equity50 = np.cumprod(1 + sampled.astype(np.float64) * 0.05, axis=1)
 
-    max_drawdowns = np.array(max_drawdowns)
-    final_returns = np.array(final_returns)
-
-    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    fig = new_figure(figsize=(16, 12))
+    axes = fig.subplots(2, 2)
 
     ax = axes[0, 0]
-    ax.hist(max_drawdowns * 100, bins=50, color=COLORS["danger"], alpha=0.8, edgecolor="none")
-    p95 = np.percentile(max_drawdowns, 95) * 100
-    p50 = np.percentile(max_drawdowns, 50) * 100
+    # bin with np.histogram and draw bars directly rather than through ax.hist
+    counts, edges = np.histogram(max_drawdowns * 100, bins=50)
+    ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge",
+           color=COLORS["danger"], alpha=0.8, edgecolor="none")
+    p50, p95 = np.percentile(max_drawdowns, [50, 95]) * 100
     ax.axvline(p50, color=COLORS["perfect"], linestyle="--", linewidth=2, label=f"Median: {p50:.1f}%")
     ax.axvline(p95, color="white", linestyle="--", linewidth=2, label=f"95th pctl: {p95:.1f}%")
     ax.set_xlabel("Max Drawdown (%)")
@@ -674,10 +757,10 @@ def analysis_8_monte_carlo_kelly():
     ax = axes[0, 1]
     positive = final_returns[final_returns >= 0]
     negative = final_returns[final_returns < 0]
-    ax.hist(positive * 100, bins=40, color=COLORS["secondary"], alpha=0.8, edgecolor="none",
-            label=f"Profitable ({len(positive) / len(final_returns) * 100:.0f}%)")
-    ax.hist(negative * 100, bins=40, color=COLORS["danger"], alpha=0.8, edgecolor="none",
-            label=f"Losing ({len(negative) / len(final_returns) * 100:.0f}%)")
+    for part, color, label in ((positive, COLORS["secondary"], "Profitable"), (negative, COLORS["danger"], "Losing")):
+        counts, edges = np.histogram(part * 100, bins=40)
+        ax.bar(edges[:-1], counts, width=np.diff(edges), align="edge", color=color, alpha=0.8,
+               edgecolor="none", label=f"{label} ({len(part) / len(final_returns) * 100:.0f}%)")
     ax.axvline(0, color="white", linestyle="-", linewidth=1)
     ax.set_xlabel("Total Return (%)")
     ax.set_ylabel("Frequency")
@@ -686,12 +769,11 @@ def analysis_8_monte_carlo_kelly():
     ax.grid(True, axis="y", alpha=0.3)
 
     ax = axes[1, 0]
-    rng2 = np.random.default_rng(42)
-    for _ in range(50):
-        sampled = rng2.choice(returns, size=n_trades_per_sim, replace=True)
-        equity = np.cumprod(1 + sampled * 0.05)
+    # ~64 points per faint trace look the same at 150 dpi; keep the last trade so the end value is exact
+    curve_x = np.unique(np.append(np.arange(0, n_trades_per_sim, max(1, n_trades_per_sim // 64)), n_trades_per_sim - 1))
+    for equity in equity50:
         color = COLORS["secondary"] if equity[-1] > 1 else COLORS["danger"]
-        ax.plot(equity, alpha=0.15, color=color, linewidth=0.8)
+        ax.plot(curve_x, equity[curve_x], alpha=0.15, color=color, linewidth=0.8)
     ax.axhline(1.0, color="white", linestyle="--", linewidth=0.5)
     ax.set_xlabel("Trade #")
     ax.set_ylabel("Portfolio Value (starting $1)")
@@ -700,23 +782,22 @@ def analysis_8_monte_carlo_kelly():
 
     ax = axes[1, 1]
     kelly_fractions = np.linspace(0.01, 0.30, 30)
-    median_returns, p5_returns, p95_returns_list = [], [], []
-    rng3 = np.random.default_rng(42)
-    for kf in kelly_fractions:
-        sim_finals = []
-        for _ in range(1000):
-            sampled = rng3.choice(returns, size=n_trades_per_sim, replace=True)
-            equity = np.cumprod(1 + sampled * kf)
-            sim_finals.append(equity[-1] - 1)
-        sim_finals = np.array(sim_finals)
-        median_returns.append(np.median(sim_finals))
-        p5_returns.append(np.percentile(sim_finals, 5))
-        p95_returns_list.append(np.percentile(sim_finals, 95))
-
-    ax.plot(kelly_fractions * 100, np.array(median_returns) * 100,
+    # the resampled trades don't depend on kf; reusing one draw also means every
+    # fraction is judged on the same 1000 paths, which keeps the curve smooth
+    idx = rng.integers(0, len(returns), dtype=np.int32, size=(1000, n_trades_per_sim))
+    # a path's final equity only depends on how often it drew each distinct return (one per
+    # price), so log(final) for every kf at once is path counts @ log1p(return * kf)
+    uniq, inverse = np.unique(returns, return_inverse=True)
+    rows = np.arange(len(idx))[:, None] * len(uniq)
+    counts = np.bincount((rows + inverse[idx]).ravel(), minlength=len(idx) * len(uniq))
+    log_steps = np.log1p(np.outer(uniq.astype(np.float64), kelly_fractions))
+    sim_finals = np.expm1(counts.reshape(len(idx), len(uniq)) @ log_steps)
+    p5_returns, median_returns, p95_returns_list = np.percentile(sim_finals, [5, 50, 95], axis=0)
+
+    ax.plot(kelly_fractions * 100, median_returns * 100,
             color=COLORS["primary"], linewidth=2, label="Median return")
     ax.fill_between(kelly_fractions * 100,
-                    np.array(p5_returns) * 100, np.array(p95_returns_list) * 100,
+                    p5_returns * 100, p95_returns_list * 100,
                     alpha=0.2, color=COLORS["primary"], label="5th-95th percentile")
     ax.axhline(0, color="white", linestyle="--", linewidth=0.5)
     ax.set_xlabel("Kelly Fraction (%)")
@@ -726,25 +807,19 @@ def analysis_8_monte_carlo_kelly():
     ax.grid(True, alpha=0.3)
 
     fig.suptitle("Monte Carlo Risk Sizing (Longshot Signal: 5-15¢ YES)",
-                 fontsize=18, fontweight="bold", y=1.01)
-    plt.tight_layout()
+                 fontsize=18, fontweight="bold")
+    fig.tight_layout(rect=(0, 0, 1, 0.96))
     _save(fig, "8_monte_carlo_kelly.png")
 
-    equity_curves = []
-    rng4 = np.random.default_rng(42)
-    for _ in range(50):
-        sampled = rng4.choice(returns, size=n_trades_per_sim, replace=True)
-        equity = np.cumprod(1 + sampled * 0.05)
-        equity_curves.append(equity.round(4).tolist())
-
     _save_json("8_monte_carlo_kelly.json", {
-        "drawdowns": (max_drawdowns * 100).round(2).tolist(),
-        "final_returns": (final_returns * 100).round(2).tolist(),
-        "equity_curves": equity_curves,
-        "kelly_fractions": (kelly_fractions * 100).round(2).tolist(),
-        "kelly_median_return": (np.array(median_returns) * 100).round(2).tolist(),
-        "kelly_p5_return": (np.array(p5_returns) * 100).round(2).tolist(),
-        "kelly_p95_return": (np.array(p95_returns_list) * 100).round(2).tolist(),
+        "drawdowns": (max_drawdowns * 100).round(2),
+        "final_returns": (final_returns * 100).round(2),
+        "equity_trade_idx": curve_x,
+        "equity_curves": equity50[:, curve_x].round(4),
+        "kelly_fractions": (kelly_fractions * 100).round(2),
+        "kelly_median_return": (median_returns * 100).round(2),
+        "kelly_p5_return": (p5_returns * 100).round(2),
+        "kelly_p95_return": (p95_returns_list * 100).round(2),
         "stats": {
             "avg_return_pct": round(avg_return * 100, 2),
             "win_rate_pct": round(win_rate * 100, 2),
@@ -757,7 +832,24 @@ def analysis_8_monte_carlo_kelly():
 # ══════════════════════════════════════════════════════════════════════════════
 #  MAIN
 # ══════════════════════════════════════════════════════════════════════════════
+LOG_CONFIG = {"level": logging.INFO, "format": "%(message)s"}
+
+
+def _run_captured(func):
+    """Run one analysis in a worker; return its printed/logged output and a traceback if it failed."""
+    buf = io.StringIO()
+    logging.basicConfig(**LOG_CONFIG, stream=buf, force=True)
+    error = None
+    with contextlib.redirect_stdout(buf):
+        try:
+            func()
+        except Exception as e:
+            error = (str(e), traceback.format_exc())
+    return buf.getvalue(), error
+
+
 def main():
+    logging.basicConfig(**LOG_CONFIG)
     print("""
     ╔══════════════════════════════════════════════════════════════╗
     ║     PREDICTION MARKET ROOKIE ANALYSIS                      ║
@@ -782,13 +874,42 @@ def main():
         ("Monte Carlo Kelly",       analysis_8_monte_carlo_kelly),
     ]
 
-    for i, (name, func) in enumerate(analyses, 1):
-        try:
-            func()
-        except Exception as e:
-            print(f"\n  ERROR: Analysis {i} ({name}) failed: {e}")
-            import traceback
-            traceback.print_exc()
+    uses_trades_joined = {
+        analysis_2_calibration_curve, analysis_3_longshot_bias, analysis_4_maker_vs_taker,
+        analysis_6_returns_by_hour, analysis_7_calibration_surface, analysis_8_monte_carlo_kelly,
+    }
+
+    # Build (or validate) the trades_joined cache here, so the workers only ever attach it read-only
+    # instead of racing to rebuild it. The connection is closed again so the buffer pool filled
+    # by the build is freed before the workers start. If that fails, the analyses that need it
+    # report the error.
+    try:
+        build_trades_joined()
+        cache_error = None
+    except Exception as e:
+        cache_error = (f"trades_joined cache could not be built: {e}", traceback.format_exc())
+
+    # Run the analyses side by side in spawned processes, each with its own DuckDB connection
+    # capped at its share of the cores and memory (DUCKDB_THREADS overrides the thread share).
+    # Each worker captures its output, which is printed here in analysis order so sections
+    # don't interleave.
+    workers = min(len(analyses), os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=use_worker_share, initargs=(workers,)) as ex:
+        futures = [
+            None if cache_error and func in uses_trades_joined else ex.submit(_run_captured, func)
+            for _, func in analyses
+        ]
+        for i, ((name, _), future) in enumerate(zip(analyses, futures), 1):
+            try:
+                output, error = future.result() if future else ("", cache_error)
+            except Exception as e:  # the worker itself died, e.g. BrokenProcessPool
+                output, error = "", (str(e), traceback.format_exc())
+            print(output, end="")
+            if error:
+                message, tb = error
+                print(f"\n  ERROR: Analysis {i} ({name}) failed: {message}")
+                print(tb, end="")
 
     print("\n" + "=" * 60)
     print("  ALL DONE!")
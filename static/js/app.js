@@ -451,7 +451,7 @@ async function renderChart8(el, d) {
     ];
     // 50 equity curves (bottom-left)
     d.equity_curves.forEach((curve, i) => {
-        const x = Array.from({ length: curve.length }, (_, j) => j);
+        const x = d.equity_trade_idx || Array.from({ length: curve.length }, (_, j) => j);
         traces.push({
             x, y: curve, type: "scatter", mode: "lines",
             line: { color: curve[curve.length - 1] > 1 ? C.green : C.red, width: 0.8 },